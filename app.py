@@ -9,7 +9,9 @@ def main() -> None:
     if not token:
         raise RuntimeError('TELE_TOKEN environment variable is required')
 
-    schedule = read_schedule('schedulebot/data')
+    schedule = read_schedule(
+        'schedulebot/data', cache_path=os.getenv('SCHEDULE_CACHE_PATH')
+    )
 
     # Run the bot until the user presses Ctrl-C
     run_bot(token, schedule)
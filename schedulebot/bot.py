@@ -1,6 +1,9 @@
 import logging
-from collections import defaultdict
-from typing import TYPE_CHECKING, Dict, Iterable, List, Optional
+import re
+from datetime import date
+from functools import lru_cache
+from itertools import groupby
+from typing import Iterator, List, Optional
 
 from babel.dates import format_date
 from telegram import ReplyKeyboardMarkup, ReplyKeyboardRemove, Update
@@ -21,9 +24,6 @@ from schedulebot.schedule import (
     get_date_range,
 )
 
-if TYPE_CHECKING:
-    from datetime import date
-
 # Enable logging
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO
@@ -38,6 +38,9 @@ BOT_BIO = """Тут можеш спитати щодо розкладу своє
 Надсилай зворотній зв'язок @lavander_ale.
 """
 
+# Telegram allows up to 4096 characters per message, keep some headroom
+MAX_MESSAGE_LENGTH = 4000
+
 
 (
     SELECT_GROUP,
@@ -45,34 +48,60 @@ BOT_BIO = """Тут можеш спитати щодо розкладу своє
 ) = range(2)
 
 
+_DATE_RANGE_MAP = {
+    'сьогодні': DateRangeRequest.TODAY,
+    'завтра': DateRangeRequest.TOMORROW,
+    'вчора': DateRangeRequest.YESTERDAY,
+    'поточний тиждень': DateRangeRequest.CURRENT_WEEK,
+    'наступний тиждень': DateRangeRequest.NEXT_WEEK,
+    'минулий тиждень': DateRangeRequest.LAST_WEEK,
+}
+_DATE_RANGE_RE = re.compile('|'.join(re.escape(key) for key in _DATE_RANGE_MAP))
+
+
 def parse_date_range(text: str) -> Optional[DateRangeRequest]:
-    text = text.lower()
-    for key, value in {
-        'сьогодні': DateRangeRequest.TODAY,
-        'завтра': DateRangeRequest.TOMORROW,
-        'вчора': DateRangeRequest.YESTERDAY,
-        'поточний тиждень': DateRangeRequest.CURRENT_WEEK,
-        'наступний тиждень': DateRangeRequest.NEXT_WEEK,
-        'минулий тиждень': DateRangeRequest.LAST_WEEK,
-    }.items():
-        if key in text:
-            return value
-
-
-def format_schedule_for_telegram(schedule_items: List[ScheduleItem]) -> Iterable[str]:
-    # Group schedule items by day (date)
-    schedule_by_day: Dict[date, List[ScheduleItem]] = defaultdict(list)
-    for item in schedule_items:
-        schedule_by_day[item.start.date()].append(item)
-
-    # Sort schedule items by slot within each day
-    for day, items in schedule_by_day.items():
-        schedule_by_day[day] = sorted(items, key=lambda x: x.slot)
-
-    # Prepare the message
-    for day, items in sorted(schedule_by_day.items()):
+    match = _DATE_RANGE_RE.search(text.lower())
+    return _DATE_RANGE_MAP[match.group(0)] if match else None
+
+
+@lru_cache(maxsize=1024)
+def _fmt_day(day: date) -> str:
+    return format_date(day, locale='uk_UA')
+
+
+def _split_text(text: str, limit: int) -> Iterator[str]:
+    """Split text by lines into pieces not longer than the limit."""
+    piece = ''
+    for line in text.splitlines(keepends=True):
+        rest = line
+        while len(rest) > limit:
+            if piece:
+                yield piece
+                piece = ''
+            yield rest[:limit]
+            rest = rest[limit:]
+        if len(piece) + len(rest) > limit:
+            yield piece
+            piece = ''
+        piece += rest
+    if piece:
+        yield piece
+
+
+def format_schedule_for_telegram(
+    schedule_items: List[ScheduleItem],
+    header: str = '',
+) -> List[str]:
+    # Sort schedule items by day and by slot within each day
+    items_sorted = sorted(schedule_items, key=lambda x: (x.start.date(), x.slot))
+
+    # Prepare the messages, packing the header and as many days as fit
+    # into each of them
+    messages: List[str] = []
+    buffer = header
+    for day, items in groupby(items_sorted, key=lambda x: x.start.date()):
         message_lines = []
-        day_str = format_date(day, locale='uk_UA')  # Format the date
+        day_str = _fmt_day(day)  # Format the date
         message_lines.append(f'*{day_str}*\n')  # Bold day header (for Telegram)
 
         for item in items:
@@ -86,7 +115,22 @@ def format_schedule_for_telegram(schedule_items: List[ScheduleItem]) -> Iterable
             )
 
         message_lines.append('')  # Add an empty line between days
-        yield '\n'.join(message_lines)
+        day_text = '\n'.join(message_lines)
+
+        if buffer and len(buffer) + len(day_text) + 1 <= MAX_MESSAGE_LENGTH:
+            buffer = f'{buffer}\n{day_text}'
+            continue
+        if buffer:
+            messages.append(buffer)
+        if len(day_text) > MAX_MESSAGE_LENGTH:
+            *pieces, buffer = _split_text(day_text, MAX_MESSAGE_LENGTH)
+            messages.extend(pieces)
+        else:
+            buffer = day_text
+
+    if buffer:
+        messages.append(buffer)
+    return messages
 
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
@@ -153,20 +197,17 @@ async def select_group(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
     start, end = get_date_range(DateRangeRequest.TODAY)
     items = schedule.calculate_schedule(group, start, end) if schedule else None
 
-    today_summary = None
-    today_schedule_text = None
     if items:
         today_summary = f'Сьогодні стіки пар: {len(items)}.'
-        for schedule_text in format_schedule_for_telegram(items):
-            today_schedule_text = schedule_text
     else:
         today_summary = 'Сьогодні вихідний!'
 
-    await update.message.reply_text(
-        f'Так, я знаю про таку групу - {group}.\n' f'{today_summary}'
-    )
-    if today_schedule_text:
-        await update.message.reply_text(today_schedule_text)
+    # Today's schedule goes along with the confirmation to save round trips
+    for text in format_schedule_for_telegram(
+        items or [],
+        header=f'Так, я знаю про таку групу - {group}.\n{today_summary}',
+    ):
+        await update.message.reply_text(text)
 
     await update.message.reply_text(
         'Який розклад тобі потрібен?',
@@ -211,8 +252,9 @@ async def show_schedule(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
     if not items:
         await update.message.reply_text(f'Вітаю, в {group} вихідні!')
     else:
-        await update.message.reply_text(f'Осьо розклад для {group}:')
-        for schedule_text in format_schedule_for_telegram(items):
+        for schedule_text in format_schedule_for_telegram(
+            items, header=f'Осьо розклад для {group}:'
+        ):
             await update.message.reply_text(schedule_text)
 
     await update.message.reply_text(
@@ -1,10 +1,25 @@
-import json
+import logging
 import os
+import posixpath
 import re
+import zipfile
 from datetime import date, datetime, time
-from typing import Any, Iterator, List, Optional
+from pathlib import Path
+from typing import IO, Any, Dict, Iterator, List, Optional
 
 import openpyxl
+import orjson
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.cell_range import CellRange
+from openpyxl.worksheet.worksheet import Worksheet
+from openpyxl.xml.constants import (
+    ARC_WORKBOOK,
+    ARC_WORKBOOK_RELS,
+    PKG_REL_NS,
+    REL_NS,
+    SHEET_MAIN_NS,
+)
+from openpyxl.xml.functions import fromstring, iterparse
 
 from schedulebot.schedule import (
     ScheduleTemplate,
@@ -13,22 +28,29 @@ from schedulebot.schedule import (
     unstructure_template,
 )
 
+logger = logging.getLogger(__name__)
+
+_MERGE_CELL_TAG = f'{{{SHEET_MAIN_NS}}}mergeCell'
+_ROW_TAG = f'{{{SHEET_MAIN_NS}}}row'
+
 DATE_PATTERN = re.compile(r'\b\d{2}\.\d{2}\b')
 
+_WEEKDAYS = {
+    'понеділок': 0,
+    'вівторок': 1,
+    'середа': 2,
+    'четвер': 3,
+    'пятниця': 4,
+    'субота': 5,
+    'неділя': 6,
+}
+_QUOTE_TRANS = str.maketrans('', '', '\'"')
+
 
 def parse_weekday(value: Any) -> int:
     if isinstance(value, str):
-        value = value.lower().split(' ')[0].replace("'", '').replace('"', '')
-        weekday = {
-            'понеділок': 0,
-            'вівторок': 1,
-            'середа': 2,
-            'четвер': 3,
-            'пятниця': 4,
-            'субота': 5,
-            'неділя': 6,
-        }.get(value, 0)
-        return weekday
+        value = value.lower().split(' ', 1)[0].translate(_QUOTE_TRANS)
+        return _WEEKDAYS.get(value, 0)
     elif isinstance(value, int):
         return value % 7
     else:
@@ -36,8 +58,7 @@ def parse_weekday(value: Any) -> int:
 
 
 def parse_time(time_str: str) -> time:
-    hour, minute = map(int, time_str.split(':'))
-    return time(hour, minute)
+    return time.fromisoformat(time_str)
 
 
 def parse_dates_from_text(text: str) -> List[date]:
@@ -49,16 +70,65 @@ def parse_dates_from_text(text: str) -> List[date]:
     ]
 
 
-def parse_schedule_template(workbook: openpyxl.Workbook) -> Iterator[ScheduleTemplate]:  # noqa: C901, PLR0912, PLR0914, PLR0915
+def get_merged_ranges(worksheet: Worksheet) -> Dict[str, CellRange]:
+    """Map merged ranges of the worksheet by their start cell coordinate."""
+    return {
+        f'{get_column_letter(mr.min_col)}{mr.min_row}': mr
+        for mr in worksheet.merged_cells.ranges
+    }
+
+
+def _read_sheet_merged_ranges(source: IO[bytes]) -> Dict[str, CellRange]:
+    merged_ranges = {}
+    for _, element in iterparse(source):
+        if element.tag == _MERGE_CELL_TAG:
+            mr = CellRange(element.get('ref'))
+            merged_ranges[f'{get_column_letter(mr.min_col)}{mr.min_row}'] = mr
+        elif element.tag == _ROW_TAG:
+            element.clear()  # Cell data is not needed, keep memory flat
+    return merged_ranges
+
+
+def read_merged_ranges(file_path: str) -> Dict[str, Dict[str, CellRange]]:
+    """Read merged ranges of every sheet straight from the workbook XML.
+
+    Read-only workbooks lack merged cells, and loading the workbook in full
+    mode just to get them costs more than parsing the values.
+    """
+    with zipfile.ZipFile(file_path) as archive:
+        workbook = fromstring(archive.read(ARC_WORKBOOK))
+        rels = fromstring(archive.read(ARC_WORKBOOK_RELS))
+        targets = {
+            rel.get('Id'): rel.get('Target')
+            for rel in rels.iter(f'{{{PKG_REL_NS}}}Relationship')
+        }
+
+        merged_ranges = {}
+        for sheet in workbook.iter(f'{{{SHEET_MAIN_NS}}}sheet'):
+            target = targets[sheet.get(f'{{{REL_NS}}}id')]
+            if target.startswith('/'):
+                sheet_path = target[1:]
+            else:
+                sheet_path = posixpath.normpath(
+                    posixpath.join(posixpath.dirname(ARC_WORKBOOK), target)
+                )
+            with archive.open(sheet_path) as source:
+                merged_ranges[sheet.get('name')] = _read_sheet_merged_ranges(source)
+        return merged_ranges
+
+
+def parse_schedule_template(  # noqa: C901, PLR0912, PLR0914, PLR0915
+    workbook: openpyxl.Workbook,
+    merged_ranges: Optional[Dict[str, Dict[str, CellRange]]] = None,
+) -> Iterator[ScheduleTemplate]:
     for sheet_name in workbook.sheetnames:
         sheet = workbook[sheet_name]
         items = []
 
-        merged_ranges_by_start = {}
-        for merged_range in sheet.merged_cells.ranges:
-            start_cell = getattr(merged_range, 'start_cell', None)
-            if start_cell:
-                merged_ranges_by_start[start_cell.coordinate] = merged_range
+        if merged_ranges is not None:
+            merged_ranges_by_start = merged_ranges.get(sheet_name, {})
+        else:
+            merged_ranges_by_start = get_merged_ranges(sheet)
 
         title_row = next(sheet.iter_rows(min_row=2, max_row=3), None)
         if not title_row or not title_row[0].value:
@@ -87,7 +157,7 @@ def parse_schedule_template(workbook: openpyxl.Workbook) -> Iterator[ScheduleTem
                     if not cell.value:
                         continue
                     group = str(cell.value).strip()
-                    group_by_column[cell.col_idx] = group
+                    group_by_column[cell.column] = group
                 continue
 
             if raw_weekday := row[0].value:
@@ -106,13 +176,14 @@ def parse_schedule_template(workbook: openpyxl.Workbook) -> Iterator[ScheduleTem
             if cur_weekday is None or cur_slot is None or cur_time is None:
                 continue
 
-            print(f'Row {i}:', cur_weekday, cur_slot, cur_time)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug('Row %d: %s %s %s', i, cur_weekday, cur_slot, cur_time)
             for col in row[3:]:
                 if col.value is None:
                     continue
 
                 try:
-                    group = group_by_column[col.col_idx]
+                    group = group_by_column[col.column]
                 except (AttributeError, KeyError):
                     continue
 
@@ -126,14 +197,22 @@ def parse_schedule_template(workbook: openpyxl.Workbook) -> Iterator[ScheduleTem
                     week_parity = WeekParity.EVEN
 
                 if mr is not None:
-                    groups = [
+                    groups = tuple(
                         group_by_column[col_idx]
                         for col_idx in range(mr.min_col, mr.max_col + 1)
-                    ]
+                    )
                 else:
-                    groups = [group]
-
-                print(col.coordinate, mr, col.value, week_parity, groups)
+                    groups = (group,)
+
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(
+                        '%s %s %s %s %s',
+                        col.coordinate,
+                        mr,
+                        col.value,
+                        week_parity,
+                        groups,
+                    )
                 name = str(col.value).strip()
                 item = ScheduleTemplateItem(
                     slot=cur_slot,
@@ -142,7 +221,7 @@ def parse_schedule_template(workbook: openpyxl.Workbook) -> Iterator[ScheduleTem
                     start=cur_time,
                     groups=groups,
                     week_parity=week_parity,
-                    dates=parse_dates_from_text(name) or None,
+                    dates=frozenset(parse_dates_from_text(name)) or None,
                 )
                 items.append(item)
 
@@ -157,18 +236,20 @@ if __name__ == '__main__':
 
     os.makedirs(output_path, exist_ok=True)
 
-    workbook = openpyxl.load_workbook(file_path)
-    schedule_templates = parse_schedule_template(workbook)
+    merged_ranges = read_merged_ranges(file_path)
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        schedule_templates = list(parse_schedule_template(workbook, merged_ranges))
+    finally:
+        workbook.close()
 
     for template in schedule_templates:
         template_filename = template.name.lower().replace(' ', '_') + '.json'
         template_path = os.path.join(output_path, template_filename)
 
-        with open(template_path, 'w', encoding='utf-8') as fp:
-            json.dump(
+        Path(template_path).write_bytes(
+            orjson.dumps(
                 unstructure_template(template),
-                fp,
-                indent=4,
-                default=str,
-                ensure_ascii=False,
+                option=orjson.OPT_INDENT_2,
             )
+        )
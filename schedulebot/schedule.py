@@ -1,11 +1,17 @@
-import json
 import logging
 import os
-import re
+import pickle  # noqa: S403
+import sqlite3
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
 from dataclasses import asdict, dataclass
 from datetime import date, datetime, time, timedelta
 from enum import Enum
-from typing import Dict, Iterable, List, Optional
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+import orjson
 
 logger = logging.getLogger(__name__)
 
@@ -15,25 +21,30 @@ class WeekParity(str, Enum):
     EVEN = 'even'
 
 
-@dataclass
+# Week parity buckets, 0 for odd weeks and 1 for even ones, an item goes to
+# every bucket of the weeks it happens in
+_PARITY_BUCKETS = {None: (0, 1), WeekParity.ODD: (0,), WeekParity.EVEN: (1,)}
+
+
+@dataclass(slots=True, frozen=True)
 class ScheduleTemplateItem:
     slot: int
     name: str
     weekday: int
     start: time
-    groups: List[str]
+    groups: Tuple[str, ...]
     week_parity: Optional[WeekParity] = None
-    dates: Optional[List[date]] = None
+    dates: Optional[FrozenSet[date]] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class ScheduleTemplate:
     name: str
     title: str
     items: List[ScheduleTemplateItem]
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ScheduleItem:
     slot: int
     name: str
@@ -48,21 +59,51 @@ class ScheduleItem:
 class ScheduleBook:
     def __init__(self):
         self._templates: List[ScheduleTemplateItem] = []
-        self._group_index: Dict[str, List[ScheduleTemplateItem]] = {}
+        self._group_index: Dict[str, Tuple[ScheduleTemplateItem, ...]] = {}
+        # Items by group, weekday and parity bucket of the week they happen in
+        self._by_group_weekday: Dict[str, List[List[List[ScheduleTemplateItem]]]] = {}
+        self._upper_groups: List[Tuple[str, str]] = []
+        self._reset_schedule_cache()
+
+    def __getstate__(self) -> dict:
+        # Cached schedules are bound to the instance and are not picklable
+        state = self.__dict__.copy()
+        del state['_cached_schedule']
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self._reset_schedule_cache()
+
+    def _reset_schedule_cache(self):
+        self._cached_schedule = lru_cache(maxsize=4096)(self._calculate_schedule)
 
     def add_template(self, template: List[ScheduleTemplateItem]):
         """Adds a template and builds a group index for faster search."""
         self._templates.extend(template)
+        new_items: Dict[str, List[ScheduleTemplateItem]] = {}
         for item in template:
             for group in item.groups:
-                if group not in self._group_index:
-                    self._group_index[group] = []
-                self._group_index[group].append(item)
+                interned = sys.intern(group)
+                new_items.setdefault(interned, []).append(item)
+                by_parity = self._by_group_weekday.setdefault(
+                    interned, [[[], []] for _ in range(7)]
+                )[item.weekday]
+                for bucket in _PARITY_BUCKETS[item.week_parity]:
+                    by_parity[bucket].append(item)
+
+        # Index entries are immutable once the template is loaded
+        for group, items in new_items.items():
+            if group not in self._group_index:
+                self._upper_groups.append((group.upper(), group))
+            self._group_index[group] = (*self._group_index.get(group, ()), *items)
+
+        self._reset_schedule_cache()
 
     def find_groups(self, pattern: str) -> Iterable[str]:
         """Find groups with schedule by pattern"""
-        regex = re.compile(re.escape(pattern), re.IGNORECASE)
-        return (group for group in self._group_index if regex.search(group))
+        pattern = pattern.upper()
+        return [group for upper, group in self._upper_groups if pattern in upper]
 
     def calculate_schedule(
         self,
@@ -70,39 +111,50 @@ class ScheduleBook:
         start: date,
         end: date,
     ) -> List[ScheduleItem]:
-        if group not in self._group_index:
-            return []
+        """Calculate schedule of the group, results are cached per date range."""
+        return list(self._cached_schedule(group, start, end))
 
+    def _calculate_schedule(
+        self,
+        group: str,
+        start: date,
+        end: date,
+    ) -> Tuple[ScheduleItem, ...]:
+        by_weekday = self._by_group_weekday.get(group)
+        if by_weekday is None:
+            return ()
+
+        # Precompute the calendar of the whole window before matching items
+        one_day = timedelta(days=1)
+        ndays = (end - start).days + 1
+        dates: List[date] = []
+        weekdays: List[int] = []
+        parity_buckets: List[int] = []
         current_date = start
-        schedule = []
-        while current_date <= end:
-            weekday = current_date.weekday()
-            week_parity = (
-                WeekParity.ODD
-                if current_date.isocalendar()[1] % 2 != 0
-                else WeekParity.EVEN
-            )
-
-            for item in self._group_index[group]:
-                if item.weekday == weekday and (
-                    item.week_parity is None or item.week_parity == week_parity
-                ):
-                    if item.dates and current_date not in item.dates:
-                        continue
-                    start_datetime = datetime.combine(current_date, item.start)
-                    # TODO: Make duration configurable
-                    end_datetime = start_datetime + timedelta(minutes=90)
-                    schedule_item = ScheduleItem(
-                        slot=item.slot,
-                        name=item.name,
-                        start=start_datetime,
-                        end=end_datetime,
-                    )
-                    schedule.append(schedule_item)
-
-            current_date += timedelta(days=1)
+        for _ in range(ndays):
+            dates.append(current_date)
+            weekdays.append(current_date.weekday())
+            parity_buckets.append(0 if current_date.isocalendar()[1] & 1 else 1)
+            current_date += one_day
 
-        return schedule
+        schedule = []
+        for i in range(ndays):
+            current_date = dates[i]
+            for item in by_weekday[weekdays[i]][parity_buckets[i]]:
+                if item.dates and current_date not in item.dates:
+                    continue
+                start_datetime = datetime.combine(current_date, item.start)
+                # TODO: Make duration configurable
+                end_datetime = start_datetime + timedelta(minutes=90)
+                schedule_item = ScheduleItem(
+                    slot=item.slot,
+                    name=item.name,
+                    start=start_datetime,
+                    end=end_datetime,
+                )
+                schedule.append(schedule_item)
+
+        return tuple(schedule)
 
 
 class DateRangeRequest(Enum):
@@ -118,8 +170,14 @@ def get_date_range(
     request: DateRangeRequest,
     today: Optional[date] = None,
 ) -> tuple[date, date]:
-    today = today or date.today()
+    return _get_date_range_cached(request, today or date.today())
+
 
+@lru_cache(maxsize=64)
+def _get_date_range_cached(
+    request: DateRangeRequest,
+    today: date,
+) -> tuple[date, date]:
     if request == DateRangeRequest.TODAY:
         return today, today
 
@@ -154,10 +212,10 @@ def structure_template_item(data: dict) -> ScheduleTemplateItem:
         slot=int(data['slot']),
         name=str(data['name']),
         weekday=int(data['weekday']),
-        groups=list(data['groups']),
+        groups=tuple(sys.intern(str(group)) for group in data['groups']),
         start=time.fromisoformat(data['start']),
         week_parity=WeekParity(parity) if (parity := data.get('week_parity')) else None,
-        dates=[date.fromisoformat(raw_date) for raw_date in dates]
+        dates=frozenset(date.fromisoformat(raw_date) for raw_date in dates)
         if (dates := data.get('dates'))
         else None,
     )
@@ -172,35 +230,178 @@ def structure_template(data: dict) -> ScheduleTemplate:
     )
 
 
+def _unstructure_fields(fields: List[tuple]) -> dict:
+    # Sets are not JSON serializable, dump them as sorted lists
+    return {
+        key: sorted(value) if isinstance(value, frozenset) else value
+        for key, value in fields
+    }
+
+
 def unstructure_template(template: ScheduleTemplate) -> dict:
-    return asdict(template)
+    return asdict(template, dict_factory=_unstructure_fields)
+
+
+def _load_items(filepath: str) -> List[ScheduleTemplateItem]:
+    logger.info('Reading file %s', filepath)
+    with open(filepath, 'rb') as fp:
+        data = orjson.loads(fp.read())
+    return [structure_template_item(item) for item in data.get('items', ())]
+
+
+SQLITE_EXTENSIONS = ('.db', '.sqlite', '.sqlite3')
+CACHE_FILENAME = '.cache.pkl'
+# Bump when the layout of ScheduleBook changes to discard stale caches
+CACHE_VERSION = 1
+
+_CREATE_ITEMS_TABLE = """
+CREATE TABLE IF NOT EXISTS items (
+    slot INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    weekday INTEGER NOT NULL,
+    start TEXT NOT NULL,
+    groups TEXT NOT NULL,
+    week_parity TEXT,
+    dates TEXT
+)
+"""
+
+def write_schedule_db(path: str, template: Iterable[ScheduleTemplateItem]):
+    """Replaces template items in a SQLite database, one row per item."""
+    rows = [
+        (
+            item.slot,
+            item.name,
+            item.weekday,
+            item.start.isoformat(),
+            orjson.dumps(item.groups).decode(),
+            item.week_parity.value if item.week_parity else None,
+            orjson.dumps(sorted(item.dates)).decode() if item.dates else None,
+        )
+        for item in template
+    ]
+
+    # The inner context commits the transaction, the outer one closes it
+    with closing(sqlite3.connect(path)) as conn, conn:
+        conn.execute(_CREATE_ITEMS_TABLE)
+        conn.execute('DELETE FROM items')
+        conn.executemany('INSERT INTO items VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+
+
+def _read_schedule_db(path: str) -> List[ScheduleTemplateItem]:
+    logger.info('Reading database %s', path)
+    with closing(sqlite3.connect(path)) as conn:
+        conn.row_factory = sqlite3.Row
+        rows = conn.execute(
+            'SELECT slot, name, weekday, start, groups, week_parity, dates FROM items'
+        ).fetchall()
+
+    return [
+        structure_template_item(
+            {
+                **row,
+                'groups': orjson.loads(row['groups']),
+                'dates': orjson.loads(dates) if (dates := row['dates']) else None,
+            }
+        )
+        for row in map(dict, rows)
+    ]
+
+
+def _load_cache(cache_path: str, paths: List[str]) -> object:
+    with open(cache_path, 'rb') as fp:
+        # The header is checked before the book is unpickled against
+        # the current classes. Source files could be added or removed
+        # without touching the others.
+        if pickle.load(fp) != (CACHE_VERSION, paths):  # noqa: S301
+            return None
+        return pickle.load(fp)  # noqa: S301
+
+
+def _read_cache(cache_path: str, paths: List[str]) -> Optional[ScheduleBook]:
+    """Returns the cached book if it is newer than all of its source files."""
+    try:
+        cache_mtime = os.path.getmtime(cache_path)
+        if any(os.path.getmtime(filepath) >= cache_mtime for filepath in paths):
+            return None
+        book = _load_cache(cache_path, paths)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        # Stale caches may refer to classes that no longer exist
+        logger.info('Ignoring schedule cache %s: %r', cache_path, e)
+        return None
+
+    if not isinstance(book, ScheduleBook):
+        return None
+
+    logger.info('Read schedule cache %s', cache_path)
+    return book
 
 
-def read_schedule(path: str) -> ScheduleBook:
+def _write_cache(cache_path: str, paths: List[str], book: ScheduleBook):
+    if not os.access(os.path.dirname(cache_path) or '.', os.W_OK):
+        logger.info('Schedule cache directory is not writable, skip %s', cache_path)
+        return
+
+    try:
+        with open(cache_path, 'wb') as fp:
+            pickle.dump((CACHE_VERSION, paths), fp, protocol=5)
+            pickle.dump(book, fp, protocol=5)
+    except OSError as e:
+        logger.warning('Failed to write schedule cache %s: %s', cache_path, e)
+
+
+def read_schedule(
+    path: str,
+    cache_path: Optional[str] = None,
+    use_cache: bool = True,
+) -> ScheduleBook:
+    """Reads schedule from a JSON file, a directory of them or a database.
+
+    Books read from a directory are cached in `cache_path`, which defaults
+    to a file inside the directory, unless `use_cache` is off. Databases are
+    only written and read by the migration entry point of this module, the
+    application reads JSON files.
+    """
     template = []
 
-    if os.path.isdir(path):
-        paths = [
-            os.path.join(dirpath, file)
-            for (dirpath, _, filenames) in os.walk(path)
-            for file in filenames
-        ]
+    if path.endswith(SQLITE_EXTENSIONS):
+        template.extend(_read_schedule_db(path))
+        cache_path = None
     else:
-        paths = [path]
-
-    for filepath in paths:
-        logger.info('Reading file %s', filepath)
-        with open(filepath, encoding='utf-8') as fp:
-            data = json.load(fp)
-            template.extend(
-                [structure_template_item(item) for item in data.get('items', ())]
+        if os.path.isdir(path):
+            paths = sorted(
+                os.path.join(dirpath, file)
+                for (dirpath, _, filenames) in os.walk(path)
+                for file in filenames
+                if file.endswith('.json')
             )
+        else:
+            paths = [path]
+
+        if use_cache and os.path.isdir(path):
+            cache_path = cache_path or os.path.join(path, CACHE_FILENAME)
+            if book := _read_cache(cache_path, paths):
+                return book
+        else:
+            cache_path = None
+
+        # Files are independent, so read and parse them concurrently
+        with ThreadPoolExecutor(max_workers=max(1, min(8, len(paths)))) as executor:
+            for items in executor.map(_load_items, paths):
+                template.extend(items)
 
     book = ScheduleBook()
     book.add_template(template)
+
+    if cache_path:
+        _write_cache(cache_path, paths, book)
     return book
 
 
 if __name__ == '__main__':
-    book = read_schedule('data/schedule.json')
-    print(book._templates)
+    # Migrate JSON schedule files into a SQLite database
+    source_path, db_path = sys.argv[1:3]
+    book = read_schedule(source_path, use_cache=False)
+    write_schedule_db(db_path, book._templates)
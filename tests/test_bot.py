@@ -0,0 +1,72 @@
+import unittest
+from datetime import datetime, timedelta
+
+from schedulebot.bot import (
+    MAX_MESSAGE_LENGTH,
+    format_schedule_for_telegram,
+)
+from schedulebot.schedule import ScheduleItem
+
+
+def make_item(slot, name, day):
+    start = datetime(2024, 10, day, 8, 30) + timedelta(hours=slot)
+    return ScheduleItem(
+        slot=slot, name=name, start=start, end=start + timedelta(minutes=90)
+    )
+
+
+class TestFormatScheduleForTelegram(unittest.TestCase):
+    def test_days_packed_into_one_message(self):
+        items = [make_item(slot, 'Math', day) for day in (8, 7) for slot in (2, 1)]
+        messages = format_schedule_for_telegram(items)
+
+        self.assertEqual(len(messages), 1)
+        # Days are in chronological order and slots are ordered within a day
+        lines = [line for line in messages[0].splitlines() if line]
+        self.assertEqual(
+            [line.split(' ')[0] for line in lines],
+            ['*7', '1', '2', '*8', '1', '2'],
+        )
+
+    def test_days_split_across_messages(self):
+        name = 'x' * (MAX_MESSAGE_LENGTH // 3)
+        items = [make_item(slot, name, day) for day in (7, 8) for slot in (1, 2)]
+        messages = format_schedule_for_telegram(items)
+
+        self.assertEqual(len(messages), 2)
+        self.assertTrue(all(len(message) <= MAX_MESSAGE_LENGTH for message in messages))
+        self.assertTrue(messages[0].startswith('*7'))
+        self.assertTrue(messages[1].startswith('*8'))
+
+    def test_day_longer_than_limit(self):
+        name = 'x' * (MAX_MESSAGE_LENGTH // 3)
+        items = [make_item(slot, name, 7) for slot in range(1, 6)]
+        items.append(make_item(1, 'Math', 8))
+        messages = format_schedule_for_telegram(items, header='Header')
+
+        self.assertEqual(messages[0], 'Header')
+        self.assertTrue(all(len(message) <= MAX_MESSAGE_LENGTH for message in messages))
+        self.assertEqual(''.join(messages[1:]).count(name), 5)
+        # The next day is packed after the remainder of the long one
+        self.assertIn('Math', messages[-1])
+        self.assertIn(name, messages[-1])
+
+    def test_line_longer_than_limit(self):
+        name = 'x' * (MAX_MESSAGE_LENGTH + 100)
+        messages = format_schedule_for_telegram([make_item(1, name, 7)])
+
+        self.assertGreater(len(messages), 1)
+        self.assertTrue(all(len(message) <= MAX_MESSAGE_LENGTH for message in messages))
+        self.assertEqual(''.join(messages).count('x'), len(name))
+
+    def test_empty_items(self):
+        self.assertEqual(format_schedule_for_telegram([]), [])
+        self.assertEqual(format_schedule_for_telegram([], header='Header'), ['Header'])
+
+    def test_header_packed_with_schedule(self):
+        messages = format_schedule_for_telegram(
+            [make_item(1, 'Math', 7)], header='Header'
+        )
+
+        self.assertEqual(len(messages), 1)
+        self.assertTrue(messages[0].startswith('Header\n*7'))
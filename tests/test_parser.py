@@ -0,0 +1,88 @@
+import os
+import tempfile
+import unittest
+from datetime import time
+
+import openpyxl
+
+from schedulebot.parser import (
+    get_merged_ranges,
+    parse_schedule_template,
+    read_merged_ranges,
+)
+from schedulebot.schedule import WeekParity
+
+
+def make_workbook():
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = 'Курс 1'
+    sheet['A2'] = 'Розклад'
+    for column, value in enumerate(['День', 'Пара', 'Час', 'G1', 'G2'], 1):
+        sheet.cell(3, column, value)
+
+    sheet.append(['Понеділок', 1, '08:30', 'Math 07.10'])
+    sheet.merge_cells('D4:E5')
+    sheet.append([])
+    sheet.append(['Вівторок', 2, '10:10', None, 'Physics'])
+    sheet.append([None, None, None, 'Biology'])
+
+    empty = workbook.create_sheet('Порожній')
+    empty['A1'] = 'Nothing here'
+    empty.merge_cells('A1:B1')
+    return workbook
+
+
+class TestParseScheduleTemplate(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.file_path = os.path.join(tmpdir.name, 'schedule.xlsx')
+        make_workbook().save(self.file_path)
+
+    def test_read_merged_ranges(self):
+        workbook = openpyxl.load_workbook(self.file_path)
+        expected = {
+            sheet.title: {
+                start: cell_range.coord
+                for start, cell_range in get_merged_ranges(sheet).items()
+            }
+            for sheet in workbook.worksheets
+        }
+
+        merged_ranges = read_merged_ranges(self.file_path)
+        self.assertEqual(
+            {
+                title: {start: cell_range.coord for start, cell_range in ranges.items()}
+                for title, ranges in merged_ranges.items()
+            },
+            expected,
+        )
+        self.assertEqual(expected['Курс 1'], {'D4': 'D4:E5'})
+
+    def test_parse_read_only(self):
+        workbook = openpyxl.load_workbook(
+            self.file_path, read_only=True, data_only=True
+        )
+        try:
+            templates = list(
+                parse_schedule_template(workbook, read_merged_ranges(self.file_path))
+            )
+        finally:
+            workbook.close()
+
+        # Same result as parsing a fully loaded workbook
+        expected = list(parse_schedule_template(openpyxl.load_workbook(self.file_path)))
+        self.assertEqual(templates, expected)
+
+        self.assertEqual(len(templates), 1)
+        items = templates[0].items
+        self.assertEqual(
+            [(item.name, item.groups, item.week_parity) for item in items],
+            [
+                ('Math 07.10', ('G1', 'G2'), None),
+                ('Physics', ('G2',), WeekParity.ODD),
+                ('Biology', ('G1',), WeekParity.EVEN),
+            ],
+        )
+        self.assertEqual(items[1].start, time(10, 10))
@@ -1,12 +1,27 @@
+import json
+import os
+import pickle  # noqa: S403
+import sys
+import tempfile
+import types
 import unittest
 from datetime import date, datetime, time
+from pathlib import Path
+from unittest.mock import patch
 
 from schedulebot.schedule import (
+    CACHE_FILENAME,
+    CACHE_VERSION,
     DateRangeRequest,
     ScheduleBook,
+    ScheduleTemplate,
     ScheduleTemplateItem,
     WeekParity,
     get_date_range,
+    read_schedule,
+    structure_template,
+    unstructure_template,
+    write_schedule_db,
 )
 
 
@@ -20,7 +35,7 @@ class TestScheduleBook(unittest.TestCase):
                 name='Math',
                 weekday=0,  # Monday
                 start=time(9, 0),
-                groups=['GroupA', 'GroupB'],
+                groups=('GroupA', 'GroupB'),
                 week_parity=WeekParity.ODD,
             ),
             ScheduleTemplateItem(
@@ -28,7 +43,7 @@ class TestScheduleBook(unittest.TestCase):
                 name='Physics',
                 weekday=2,  # Wednesday
                 start=time(11, 0),
-                groups=['GroupA'],
+                groups=('GroupA',),
                 week_parity=WeekParity.EVEN,
             ),
             ScheduleTemplateItem(
@@ -36,7 +51,7 @@ class TestScheduleBook(unittest.TestCase):
                 name='Chemistry',
                 weekday=4,  # Friday
                 start=time(14, 0),
-                groups=['GroupB'],
+                groups=('GroupB',),
                 week_parity=None,  # Happens every week
             ),
         ]
@@ -83,6 +98,49 @@ class TestScheduleBook(unittest.TestCase):
         self.assertEqual(schedule[1].start, datetime(2024, 10, 11, 14, 0))
         self.assertEqual(schedule[1].end, datetime(2024, 10, 11, 15, 30))
 
+    def test_calculate_schedule_with_dates(self):
+        self.book.add_template(
+            [
+                ScheduleTemplateItem(
+                    slot=4,
+                    name='Seminar 08.10',
+                    weekday=1,  # Tuesday
+                    start=time(16, 0),
+                    groups=('GroupA',),
+                    dates=frozenset([date(2024, 10, 8)]),
+                ),
+            ]
+        )
+
+        schedule = self.book.calculate_schedule(
+            'GroupA', date(2024, 10, 7), date(2024, 10, 20)
+        )
+        # Seminar happens only on the listed date, not on the next Tuesday
+        self.assertEqual(
+            [item.name for item in schedule], ['Math', 'Seminar 08.10', 'Physics']
+        )
+
+    def test_calculate_schedule_cache(self):
+        start = date(2024, 10, 7)
+        end = date(2024, 10, 11)
+        schedule = self.book.calculate_schedule('GroupB', start, end)
+        schedule.clear()
+        self.assertEqual(len(self.book.calculate_schedule('GroupB', start, end)), 2)
+
+        # Adding a template invalidates cached schedules
+        self.book.add_template(
+            [
+                ScheduleTemplateItem(
+                    slot=2,
+                    name='Biology',
+                    weekday=3,  # Thursday
+                    start=time(11, 0),
+                    groups=('GroupB',),
+                ),
+            ]
+        )
+        self.assertEqual(len(self.book.calculate_schedule('GroupB', start, end)), 3)
+
     def test_empty_schedule_for_nonexistent_group(self):
         start = date(2024, 10, 7)
         end = date(2024, 10, 11)
@@ -92,6 +150,173 @@ class TestScheduleBook(unittest.TestCase):
         self.assertEqual(len(schedule), 0)
 
 
+class TestTemplateStructuring(unittest.TestCase):
+    def test_roundtrip(self):
+        template = ScheduleTemplate(
+            name='Курс 1',
+            title='Розклад',
+            items=[
+                ScheduleTemplateItem(
+                    slot=1,
+                    name='Math',
+                    weekday=0,
+                    start=time(9, 0),
+                    groups=('GroupA',),
+                    week_parity=WeekParity.ODD,
+                    dates=frozenset([date(2024, 10, 14), date(2024, 10, 7)]),
+                ),
+            ],
+        )
+
+        # Frozen items are hashable
+        self.assertEqual(len({template.items[0], template.items[0]}), 1)
+
+        data = unstructure_template(template)
+        self.assertEqual(
+            data['items'][0]['dates'], [date(2024, 10, 7), date(2024, 10, 14)]
+        )
+
+        data['items'][0]['start'] = '09:00'
+        data['items'][0]['dates'] = ['2024-10-07', '2024-10-14']
+        self.assertEqual(structure_template(data), template)
+
+
+class TestReadSchedule(unittest.TestCase):
+    @staticmethod
+    def _write_template(dirpath, group, weekday):
+        data = {
+            'name': group,
+            'title': group,
+            'items': [
+                {
+                    'slot': 1,
+                    'name': f'Math {group}',
+                    'weekday': weekday,
+                    'start': '09:00:00',
+                    'groups': [group],
+                    'week_parity': None,
+                    'dates': None,
+                }
+            ],
+        }
+        filepath = os.path.join(dirpath, f'{group}.json')
+        with open(filepath, 'w', encoding='utf-8') as fp:
+            json.dump(data, fp)
+        return filepath
+
+    def test_read_directory(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for i, group in enumerate(['GroupA', 'GroupB']):
+                self._write_template(tmpdir, group, i)
+
+            book = read_schedule(tmpdir)
+
+        self.assertEqual(sorted(book.find_groups('group')), ['GroupA', 'GroupB'])
+        schedule = book.calculate_schedule(
+            'GroupB', date(2024, 10, 7), date(2024, 10, 13)
+        )
+        self.assertEqual(len(schedule), 1)
+        self.assertEqual(schedule[0].start, datetime(2024, 10, 8, 9, 0))
+
+    def test_read_directory_cache(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filepath = self._write_template(tmpdir, 'GroupA', 0)
+            book = read_schedule(tmpdir)
+            self.assertTrue(os.path.exists(os.path.join(tmpdir, CACHE_FILENAME)))
+
+            with patch('schedulebot.schedule._load_items') as load_items:
+                cached_book = read_schedule(tmpdir)
+                load_items.assert_not_called()
+            self.assertEqual(cached_book._templates, book._templates)
+
+            # Adding a file invalidates the cache
+            self._write_template(tmpdir, 'GroupB', 1)
+            book = read_schedule(tmpdir)
+            self.assertEqual(sorted(book.find_groups('group')), ['GroupA', 'GroupB'])
+
+            # So does modifying one
+            self._write_template(tmpdir, 'GroupA', 2)
+            cache_mtime = os.path.getmtime(os.path.join(tmpdir, CACHE_FILENAME))
+            os.utime(filepath, (cache_mtime + 1, cache_mtime + 1))
+            book = read_schedule(tmpdir)
+            schedule = book.calculate_schedule(
+                'GroupA', date(2024, 10, 7), date(2024, 10, 13)
+            )
+            self.assertEqual(schedule[0].start, datetime(2024, 10, 9, 9, 0))
+
+    def test_read_directory_cache_path(self):
+        with (
+            tempfile.TemporaryDirectory() as tmpdir,
+            tempfile.TemporaryDirectory() as cachedir,
+        ):
+            self._write_template(tmpdir, 'GroupA', 0)
+            cache_path = os.path.join(cachedir, 'schedule.pkl')
+            read_schedule(tmpdir, cache_path=cache_path)
+
+            self.assertTrue(os.path.exists(cache_path))
+            self.assertFalse(os.path.exists(os.path.join(tmpdir, CACHE_FILENAME)))
+
+    def test_read_directory_without_cache(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            self._write_template(tmpdir, 'GroupA', 0)
+            book = read_schedule(tmpdir, use_cache=False)
+
+            self.assertEqual(list(book.find_groups('group')), ['GroupA'])
+            self.assertFalse(os.path.exists(os.path.join(tmpdir, CACHE_FILENAME)))
+
+    def test_read_directory_stale_cache(self):
+        # A book pickled from a module that is gone afterwards
+        module = types.ModuleType('schedulebot_removed')
+        module.ScheduleBook = type('ScheduleBook', (), {})
+        module.ScheduleBook.__module__ = module.__name__
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filepath = self._write_template(tmpdir, 'GroupA', 0)
+            os.utime(filepath, (0, 0))
+            with patch.dict(sys.modules, {module.__name__: module}):
+                cache = pickle.dumps((CACHE_VERSION, [filepath])) + pickle.dumps(
+                    module.ScheduleBook()
+                )
+            Path(tmpdir, CACHE_FILENAME).write_bytes(cache)
+
+            book = read_schedule(tmpdir)
+            self.assertEqual(list(book.find_groups('group')), ['GroupA'])
+
+            # The cache is rebuilt and used afterwards
+            with patch('schedulebot.schedule._load_items') as load_items:
+                read_schedule(tmpdir)
+                load_items.assert_not_called()
+
+    def test_read_database(self):
+        template = [
+            ScheduleTemplateItem(
+                slot=1,
+                name='Math 07.10',
+                weekday=0,
+                start=time(9, 0),
+                groups=('GroupA', 'GroupB'),
+                week_parity=WeekParity.ODD,
+                dates=frozenset([date(2024, 10, 7)]),
+            ),
+            ScheduleTemplateItem(
+                slot=2,
+                name='Physics',
+                weekday=2,
+                start=time(11, 0),
+                groups=('GroupA',),
+            ),
+        ]
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db_path = os.path.join(tmpdir, 'schedule.sqlite')
+            write_schedule_db(db_path, template)
+            # Writing again replaces the stored items
+            write_schedule_db(db_path, template)
+            book = read_schedule(db_path)
+
+        self.assertEqual(book._templates, template)
+
+
 class TestGetDateRange(unittest.TestCase):
     def test_today(self):
         result = get_date_range(DateRangeRequest.TODAY, today=date(2024, 10, 3))